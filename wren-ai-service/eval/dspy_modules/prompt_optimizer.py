@@ -55,7 +55,9 @@ optimizer_parameters = {
 
 
 def configure_llm_provider(llm: str, api_key: str):
-    dspy.settings.configure(lm=dspy.LM(model=llm, api_key=api_key))
+    # responses are cached on disk (DSPY_CACHEDIR), so repeated optimizing/evaluating runs
+    # over the same dataset don't re-hit the LLM for identical (question, context) pairs
+    dspy.settings.configure(lm=dspy.LM(model=llm, api_key=api_key, cache=True))
 
 
 def clean_sql(sql: str) -> str:
@@ -40,6 +40,14 @@ class Settings(BaseSettings):
     allow_intent_classification: bool = Field(default=True)
     allow_sql_generation_reasoning: bool = Field(default=True)
     max_histories: int = Field(default=5)
+    semantic_cache_enabled: bool = Field(default=False)
+    semantic_cache_similarity_threshold: float = Field(default=0.95)
+    semantic_cache_ttl: int = Field(default=3600)  # unit: seconds
+    current_time_granularity: int = Field(default=60)  # unit: seconds
+    # call the SQL generation steps directly instead of through the Hamilton driver
+    fast_path: bool = Field(default=False, alias="WREN_FAST_PATH")
+    # deduplicate and sort the retrieved items in the SQL generation prompt to raise the prompt cache hit rate
+    stable_prompt_order: bool = Field(default=False, alias="WREN_STABLE_PROMPT_ORDER")
 
     # engine config
     engine_timeout: float = Field(default=30.0)
@@ -27,20 +27,14 @@ class Engine(metaclass=ABCMeta):
         ...
 
 
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+# code fences, quotes and semicolons wrapping the generated JSON/SQL
+_GENERATION_NOISE_PATTERN = re.compile(r"```sql|```json|```|\"\"\"|'''|;")
+
+
 def clean_generation_result(result: str) -> str:
-    def _normalize_whitespace(s: str) -> str:
-        return re.sub(r"\s+", " ", s).strip()
-
-    return (
-        _normalize_whitespace(result)
-        .replace("\\n", " ")
-        .replace("```sql", "")
-        .replace("```json", "")
-        .replace('"""', "")
-        .replace("'''", "")
-        .replace("```", "")
-        .replace(";", "")
-    )
+    normalized = _WHITESPACE_PATTERN.sub(" ", result).strip().replace("\\n", " ")
+    return _GENERATION_NOISE_PATTERN.sub("", normalized)
 
 
 def remove_limit_statement(sql: str) -> str:
@@ -127,6 +127,12 @@ def create_service_container(
                 "sql_generation": generation.SQLGeneration(
                     **pipe_components["sql_generation"],
                     engine_timeout=settings.engine_timeout,
+                    semantic_cache_enabled=settings.semantic_cache_enabled,
+                    semantic_cache_similarity_threshold=settings.semantic_cache_similarity_threshold,
+                    semantic_cache_ttl=settings.semantic_cache_ttl,
+                    current_time_granularity=settings.current_time_granularity,
+                    fast_path=settings.fast_path,
+                    stable_prompt_order=settings.stable_prompt_order,
                 ),
                 "sql_generation_reasoning": generation.SQLGenerationReasoning(
                     **pipe_components["sql_generation_reasoning"],
@@ -215,6 +221,12 @@ def create_service_container(
                 "sql_generation": generation.SQLGeneration(
                     **pipe_components["question_recommendation_sql_generation"],
                     engine_timeout=settings.engine_timeout,
+                    semantic_cache_enabled=settings.semantic_cache_enabled,
+                    semantic_cache_similarity_threshold=settings.semantic_cache_similarity_threshold,
+                    semantic_cache_ttl=settings.semantic_cache_ttl,
+                    current_time_granularity=settings.current_time_granularity,
+                    fast_path=settings.fast_path,
+                    stable_prompt_order=settings.stable_prompt_order,
                 ),
                 "sql_generation_reasoning": generation.SQLGenerationReasoning(
                     **pipe_components["sql_generation_reasoning"],
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import sys
 from typing import Any, Optional
@@ -9,12 +10,15 @@ from langfuse.decorators import observe
 
 from src.core.engine import Engine
 from src.core.pipeline import BasicPipeline
-from src.core.provider import LLMProvider
+from src.core.provider import EmbedderProvider, LLMProvider
 from src.pipelines.generation.utils.sql import (
     SQL_GENERATION_MODEL_KWARGS,
+    SQLGenerationCache,
     SQLGenPostProcessor,
     construct_instructions,
-    sql_generation_system_prompt,
+    construct_sql_generation_system_prompt,
+    json_key,
+    stable_order,
 )
 from src.pipelines.retrieval.sql_functions import SqlFunction
 from src.web.v1.services import Configuration
@@ -22,37 +26,29 @@ from src.web.v1.services import Configuration
 logger = logging.getLogger("wren-ai-service")
 
 
+# sections are ordered from the most static to the most dynamic ones,
+# so the rendered prompts share the longest possible prefix for the LLM providers' prompt caching
 sql_generation_user_prompt_template = """
+{% if sql_functions %}
+### SQL FUNCTIONS ###
+{{ sql_functions }}
+{% endif %}
+
 ### DATABASE SCHEMA ###
-{% for document in documents %}
-    {{ document }}
-{% endfor %}
+{{ documents }}
 
 {% if instructions %}
 ### INSTRUCTIONS ###
 {{ instructions }}
 {% endif %}
 
-{% if sql_functions %}
-### SQL FUNCTIONS ###
-{% for function in sql_functions %}
-{{ function }}
-{% endfor %}
-{% endif %}
-
 {% if sql_samples %}
 ### SQL SAMPLES ###
-{% for sample in sql_samples %}
-Question:
-{{sample.question}}
-SQL:
-{{sample.sql}}
-{% endfor %}
+{{ sql_samples }}
 {% endif %}
 
 ### QUESTION ###
 User's Question: {{ query }}
-Current Time: {{ current_time }}
 
 {% if sql_generation_reasoning %}
 ### REASONING PLAN ###
@@ -60,44 +56,102 @@ Current Time: {{ current_time }}
 {% endif %}
 
 Let's think step by step.
+
+Current Time: {{ current_time }}
 """
 
 
 ## Start of Pipeline
+def current_time(
+    configuration: Configuration,
+    current_time_granularity: int = 1,
+) -> str:
+    return configuration.show_current_time(current_time_granularity)
+
+
 @observe(capture_input=False)
 def prompt(
     query: str,
     documents: list[str],
     prompt_builder: PromptBuilder,
+    current_time: str,
     sql_generation_reasoning: str | None = None,
     configuration: Configuration | None = None,
     sql_samples: list[dict] | None = None,
     instructions: list[dict] | None = None,
-    has_calculated_field: bool = False,
-    has_metric: bool = False,
     sql_functions: list[SqlFunction] | None = None,
 ) -> dict:
+    # the lists are joined here instead of looping over them in the template
     return prompt_builder.run(
         query=query,
-        documents=documents,
+        documents="\n\n".join(documents),
         sql_generation_reasoning=sql_generation_reasoning,
+        # the instructions of calculated fields and metrics are in the system prompt of the generator
         instructions=construct_instructions(
             configuration,
-            has_calculated_field,
-            has_metric,
-            instructions,
+            instructions=instructions,
         ),
-        sql_samples=sql_samples,
-        current_time=configuration.show_current_time(),
-        sql_functions=sql_functions,
+        sql_samples="\n\n".join(
+            f"Question:\n{sample.get('question')}\nSQL:\n{sample.get('sql')}"
+            for sample in sql_samples or []
+        ),
+        current_time=current_time,
+        sql_functions="\n\n".join(map(str, sql_functions or [])),
+    )
+
+
+@observe(capture_input=False)
+async def generation_cache_lookup(
+    prompt: dict,
+    query: str,
+    documents: list[str],
+    current_time: str,
+    sql_generation_reasoning: str | None,
+    configuration: Configuration | None,
+    sql_samples: list[dict] | None,
+    instructions: list[dict] | None,
+    sql_functions: list[SqlFunction] | None,
+    has_calculated_field: bool,
+    has_metric: bool,
+    generation_cache: SQLGenerationCache | None,
+) -> SQLGenerationCache.Lookup | None:
+    if not generation_cache:
+        return None
+
+    fiscal_year = configuration.fiscal_year if configuration else None
+    timezone = configuration.timezone if configuration else None
+    return await generation_cache.lookup(
+        prompt=prompt.get("prompt"),
+        query=query,
+        # every prompt section except the question, the cached replies are only reused within the same context
+        context={
+            "documents": documents,
+            "sql_generation_reasoning": sql_generation_reasoning,
+            "sql_samples": sql_samples,
+            "instructions": instructions,
+            "sql_functions": [str(function) for function in sql_functions or []],
+            "fiscal_year": fiscal_year.model_dump() if fiscal_year else None,
+            # the SQL may hold literal date ranges relative to the current time
+            "timezone": timezone.name if timezone else None,
+            "current_time": current_time,
+            "has_calculated_field": has_calculated_field,
+            "has_metric": has_metric,
+        },
     )
 
 
 @observe(as_type="generation", capture_input=False)
 async def generate_sql(
     prompt: dict,
-    generator: Any,
+    generators: dict[tuple[bool, bool], Any],
+    generation_cache_lookup: SQLGenerationCache.Lookup | None,
+    has_calculated_field: bool = False,
+    has_metric: bool = False,
 ) -> dict:
+    if generation_cache_lookup and generation_cache_lookup.hit:
+        return generation_cache_lookup.replies
+
+    generator = generators[(has_calculated_field, has_metric)]
     return await generator(prompt=prompt.get("prompt"))
 
 
@@ -106,14 +160,28 @@ async def post_process(
     generate_sql: dict,
     post_processor: SQLGenPostProcessor,
     engine_timeout: float,
+    generation_cache_lookup: SQLGenerationCache.Lookup | None,
+    generation_cache: SQLGenerationCache | None,
     project_id: str | None = None,
 ) -> dict:
-    return await post_processor.run(
+    result = await post_processor.run(
         generate_sql.get("replies"),
         timeout=engine_timeout,
         project_id=project_id,
     )
 
+    # only the replies passing the dry run are cached, so an invalid SQL is never served from the cache
+    if (
+        generation_cache
+        and generation_cache_lookup
+        and not generation_cache_lookup.hit
+        and result.get("valid_generation_results")
+        and not result.get("invalid_generation_results")
+    ):
+        generation_cache.store(generation_cache_lookup, generate_sql)
+
+    return result
+
 
 ## End of Pipeline
 
@@ -123,23 +191,49 @@ class SQLGeneration(BasicPipeline):
         self,
         llm_provider: LLMProvider,
         engine: Engine,
+        embedder_provider: Optional[EmbedderProvider] = None,
         engine_timeout: Optional[float] = 30.0,
+        semantic_cache_enabled: bool = False,
+        semantic_cache_similarity_threshold: float = 0.95,
+        semantic_cache_ttl: int = 60 * 60,
+        current_time_granularity: int = 60,
+        fast_path: bool = False,
+        stable_prompt_order: bool = False,
         **kwargs,
     ):
         self._components = {
-            "generator": llm_provider.get_generator(
-                system_prompt=sql_generation_system_prompt,
-                generation_kwargs=SQL_GENERATION_MODEL_KWARGS,
-            ),
+            # one generator per combination of the schema structures, keyed by (has_calculated_field, has_metric)
+            "generators": {
+                (has_calculated_field, has_metric): llm_provider.get_generator(
+                    system_prompt=construct_sql_generation_system_prompt(
+                        has_calculated_field, has_metric
+                    ),
+                    generation_kwargs=SQL_GENERATION_MODEL_KWARGS,
+                )
+                for has_calculated_field in (False, True)
+                for has_metric in (False, True)
+            },
             "prompt_builder": PromptBuilder(
                 template=sql_generation_user_prompt_template
             ),
             "post_processor": SQLGenPostProcessor(engine=engine),
+            "generation_cache": SQLGenerationCache(
+                embedder=embedder_provider.get_text_embedder()
+                if embedder_provider
+                else None,
+                similarity_threshold=semantic_cache_similarity_threshold,
+                ttl=semantic_cache_ttl,
+            )
+            if semantic_cache_enabled
+            else None,
         }
 
         self._configs = {
             "engine_timeout": engine_timeout,
+            "current_time_granularity": current_time_granularity,
         }
+        self._fast_path = fast_path
+        self._stable_prompt_order = stable_prompt_order
 
         super().__init__(
             AsyncDriver({}, sys.modules[__name__], result_builder=base.DictResult())
@@ -160,22 +254,102 @@ class SQLGeneration(BasicPipeline):
         sql_functions: list[SqlFunction] | None = None,
     ):
         logger.info("SQL Generation pipeline is running...")
-        return await self._pipe.execute(
-            ["post_process"],
-            inputs={
-                "query": query,
-                "documents": contexts,
-                "sql_generation_reasoning": sql_generation_reasoning,
-                "sql_samples": sql_samples,
-                "instructions": instructions,
-                "project_id": project_id,
-                "configuration": configuration,
-                "has_calculated_field": has_calculated_field,
-                "has_metric": has_metric,
-                "sql_functions": sql_functions,
-                **self._components,
-                **self._configs,
-            },
+        if self._stable_prompt_order:
+            contexts = stable_order(contexts)
+            sql_samples = stable_order(sql_samples, key=json_key)
+            instructions = stable_order(instructions, key=json_key)
+            sql_functions = stable_order(sql_functions)
+
+        inputs = {
+            "query": query,
+            "documents": contexts,
+            "sql_generation_reasoning": sql_generation_reasoning,
+            "sql_samples": sql_samples,
+            "instructions": instructions,
+            "project_id": project_id,
+            "configuration": configuration,
+            "has_calculated_field": has_calculated_field,
+            "has_metric": has_metric,
+            "sql_functions": sql_functions,
+            **self._components,
+            **self._configs,
+        }
+
+        if self._fast_path:
+            return await self._execute_directly(inputs)
+
+        return await self._pipe.execute(["post_process"], inputs=inputs)
+
+    async def _execute_directly(self, inputs: dict) -> dict:
+        """
+        Call current_time -> prompt -> generation_cache_lookup -> generate_sql -> post_process in order, without resolving the Hamilton DAG.
+        The result has the same shape as the result of `self._pipe.execute(["post_process"], ...)`.
+        """
+        _current_time = current_time(
+            configuration=inputs["configuration"],
+            current_time_granularity=inputs["current_time_granularity"],
+        )
+        _prompt = prompt(
+            query=inputs["query"],
+            current_time=_current_time,
+            documents=inputs["documents"],
+            prompt_builder=inputs["prompt_builder"],
+            sql_generation_reasoning=inputs["sql_generation_reasoning"],
+            configuration=inputs["configuration"],
+            sql_samples=inputs["sql_samples"],
+            instructions=inputs["instructions"],
+            sql_functions=inputs["sql_functions"],
+        )
+        _generation_cache_lookup = await generation_cache_lookup(
+            prompt=_prompt,
+            query=inputs["query"],
+            documents=inputs["documents"],
+            current_time=_current_time,
+            sql_generation_reasoning=inputs["sql_generation_reasoning"],
+            configuration=inputs["configuration"],
+            sql_samples=inputs["sql_samples"],
+            instructions=inputs["instructions"],
+            sql_functions=inputs["sql_functions"],
+            has_calculated_field=inputs["has_calculated_field"],
+            has_metric=inputs["has_metric"],
+            generation_cache=inputs["generation_cache"],
+        )
+        _generate_sql = await generate_sql(
+            prompt=_prompt,
+            generators=inputs["generators"],
+            generation_cache_lookup=_generation_cache_lookup,
+            has_calculated_field=inputs["has_calculated_field"],
+            has_metric=inputs["has_metric"],
+        )
+        return {
+            "post_process": await post_process(
+                generate_sql=_generate_sql,
+                post_processor=inputs["post_processor"],
+                engine_timeout=inputs["engine_timeout"],
+                generation_cache_lookup=_generation_cache_lookup,
+                generation_cache=inputs["generation_cache"],
+                project_id=inputs["project_id"],
+            )
+        }
+
+    async def run_batch(
+        self,
+        queries: list[dict],
+        max_concurrency: int = 16,
+    ) -> list[dict | Exception]:
+        """
+        Run the pipeline for multiple queries concurrently, with at most `max_concurrency` runs in flight.
+        Each item of `queries` holds the keyword arguments of `run`, and the results keep the same order.
+        A failed run doesn't affect the others, its exception is returned in place of its result.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _run(query: dict) -> dict:
+            async with semaphore:
+                return await self.run(**query)
+
+        return await asyncio.gather(
+            *[_run(query) for query in queries], return_exceptions=True
         )
 
 
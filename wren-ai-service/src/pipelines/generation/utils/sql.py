@@ -1,9 +1,15 @@
 import asyncio
+import functools
+import hashlib
 import logging
-from typing import Any, Dict, List, Optional
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
 
 import aiohttp
+import numpy as np
 import orjson
+from cachetools import TTLCache
 from haystack import component
 from haystack.dataclasses import ChatMessage
 from pydantic import BaseModel
@@ -129,6 +135,124 @@ class SQLGenPostProcessor:
         return valid_generation_results, invalid_generation_results
 
 
+class SQLGenerationCache:
+    """
+    Two-tier cache of the LLM replies of SQL generation.
+
+    The first tier is an exact match on the rendered prompt. The second tier is optional and
+    only used if an embedder is given: the question is embedded and compared with the questions
+    previously answered with the same context, i.e. every section of the prompt except the question,
+    and the cached replies are reused if the cosine similarity is above the threshold.
+
+    Looking up and storing are separate steps, so the replies are only stored after they are validated.
+    """
+
+    @dataclass
+    class Lookup:
+        prompt_key: str
+        context_key: str
+        embedding: np.ndarray | None = None
+        replies: dict | None = None
+
+        @property
+        def hit(self) -> bool:
+            return self.replies is not None
+
+    def __init__(
+        self,
+        embedder: Any | None = None,
+        similarity_threshold: float = 0.95,
+        maxsize: int = 1_000,
+        ttl: int = 60 * 60,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self._embedder = embedder
+        self._similarity_threshold = similarity_threshold
+        self._ttl = ttl
+        self._timer = timer
+        self._replies: Dict[str, dict] = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+        # context key -> list of (stored time, normalized question embedding, replies);
+        # the list is written back on every store, which resets its TTL, so each entry also expires on its own
+        self._questions: Dict[str, List[tuple[float, np.ndarray, dict]]] = TTLCache(
+            maxsize=maxsize, ttl=ttl, timer=timer
+        )
+        self._max_questions_per_context = 100
+
+    @staticmethod
+    def _hash(payload: Any) -> str:
+        return hashlib.blake2b(
+            orjson.dumps(payload, default=str, option=orjson.OPT_SORT_KEYS),
+            digest_size=16,
+        ).hexdigest()
+
+    async def _embed(self, query: str) -> np.ndarray | None:
+        try:
+            embedding = np.asarray(
+                (await self._embedder.run(query))["embedding"], dtype=np.float32
+            )
+            norm = np.linalg.norm(embedding)
+            return embedding / norm if norm else None
+        except Exception as e:
+            logger.exception(f"Error in SQLGenerationCache while embedding: {e}")
+            return None
+
+    def _unexpired(self, context_key: str) -> List[tuple[float, np.ndarray, dict]]:
+        expired_before = self._timer() - self._ttl
+        return [
+            entry
+            for entry in self._questions.get(context_key, [])
+            if entry[0] > expired_before
+        ]
+
+    def _lookup_similar(self, context_key: str, embedding: np.ndarray) -> dict | None:
+        if not (entries := self._unexpired(context_key)):
+            return None
+
+        similarities = np.stack([entry[1] for entry in entries]) @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self._similarity_threshold:
+            return entries[best][2]
+
+        return None
+
+    async def lookup(self, prompt: str, query: str, context: dict) -> Lookup:
+        """
+        `context` holds every input of the request except the question, e.g. the schema documents,
+        instructions, SQL samples, reasoning plan, SQL functions and current time. It must be JSON serializable.
+        """
+        # the context is also part of the exact-match key, as some of it is not in the user prompt, e.g. the system prompt
+        context_key = self._hash(context)
+        lookup = self.Lookup(
+            prompt_key=self._hash(
+                {"prompt": prompt, "question": query, "context": context_key}
+            ),
+            context_key=context_key,
+        )
+        if (replies := self._replies.get(lookup.prompt_key)) is not None:
+            logger.info("Hit exact-match cache of SQL Generation")
+            lookup.replies = replies
+            return lookup
+
+        if self._embedder and (embedding := await self._embed(query)) is not None:
+            lookup.embedding = embedding
+            if (
+                replies := self._lookup_similar(lookup.context_key, embedding)
+            ) is not None:
+                logger.info("Hit semantic cache of SQL Generation")
+                lookup.replies = replies
+
+        return lookup
+
+    def store(self, lookup: Lookup, replies: dict) -> None:
+        self._replies[lookup.prompt_key] = replies
+        if lookup.embedding is not None:
+            entries = self._unexpired(lookup.context_key)
+            entries.append((self._timer(), lookup.embedding, replies))
+            self._questions[lookup.context_key] = entries[
+                -self._max_questions_per_context :
+            ]
+
+
 TEXT_TO_SQL_RULES = """
 ### SQL RULES ###
 - ONLY USE SELECT statements, NO DELETE, UPDATE OR INSERT etc. statements that might change the data in the database.
@@ -395,28 +519,79 @@ Learn about the usage of the schema structures and generate SQL based on them.
 """
 
 
-def construct_instructions(
-    configuration: Configuration | None = Configuration(),
-    has_calculated_field: bool = False,
-    has_metric: bool = False,
-    instructions: list[dict] | None = None,
-):
+@functools.lru_cache(maxsize=512)
+def _construct_instructions(
+    fiscal_year: tuple[str, str] | None,
+    has_calculated_field: bool,
+    has_metric: bool,
+    instructions: tuple[str, ...],
+) -> str:
     _instructions = ""
-    if configuration:
-        if configuration.fiscal_year:
-            _instructions += f"\n- For calendar year related computation, it should be started from {configuration.fiscal_year.start} to {configuration.fiscal_year.end}\n\n"
+    if fiscal_year:
+        _instructions += f"\n- For calendar year related computation, it should be started from {fiscal_year[0]} to {fiscal_year[1]}\n\n"
     if has_calculated_field:
         _instructions += calculated_field_instructions
     if has_metric:
         _instructions += metric_instructions
     if instructions:
         _instructions += "\n\n".join(
-            [f"{instruction.get('instruction')}\n\n" for instruction in instructions]
+            [f"{instruction}\n\n" for instruction in instructions]
         )
 
     return _instructions
 
 
+def construct_instructions(
+    configuration: Configuration | None = Configuration(),
+    has_calculated_field: bool = False,
+    has_metric: bool = False,
+    instructions: list[dict] | None = None,
+):
+    # the inputs are frozen into hashable values, so the same instructions are only built once
+    fiscal_year = configuration.fiscal_year if configuration else None
+    return _construct_instructions(
+        (fiscal_year.start, fiscal_year.end) if fiscal_year else None,
+        has_calculated_field,
+        has_metric,
+        tuple(instruction.get("instruction") for instruction in instructions or []),
+    )
+
+
+def construct_sql_generation_system_prompt(
+    has_calculated_field: bool = False,
+    has_metric: bool = False,
+) -> str:
+    # the instructions of calculated fields and metrics are static texts, so they are sent with the system prompt,
+    # which is the prefix of every request and can be reused by the LLM providers' prompt caching
+    system_prompt = sql_generation_system_prompt
+    if has_calculated_field or has_metric:
+        system_prompt += "\n### SCHEMA STRUCTURES ###\n"
+    if has_calculated_field:
+        system_prompt += calculated_field_instructions
+    if has_metric:
+        system_prompt += metric_instructions
+
+    return system_prompt
+
+
+def stable_order(
+    items: list | None,
+    key: Callable[[Any], str | bytes] = str,
+) -> list | None:
+    """
+    Deduplicate the items and sort them by `key`, so the same set of items retrieved in a different order
+    renders the same prompt.
+    """
+    if not items:
+        return items
+
+    return sorted({key(item): item for item in items}.values(), key=key)
+
+
+def json_key(item: dict) -> bytes:
+    return orjson.dumps(item, option=orjson.OPT_SORT_KEYS)
+
+
 class SqlGenerationResult(BaseModel):
     sql: str
 
@@ -1,5 +1,4 @@
 import asyncio
-import json
 import logging
 from typing import Any, Dict, List, Optional
 
@@ -57,8 +56,8 @@ class MDLValidator:
     def run(self, mdl: str) -> str:
         try:
             mdl_json = orjson.loads(mdl)
-            logger.info(f"MDL JSON: {mdl_json}")
-        except json.JSONDecodeError as e:
+            logger.debug("MDL JSON: %s", mdl_json)
+        except orjson.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON: {e}")
         if "models" not in mdl_json:
             mdl_json["models"] = []
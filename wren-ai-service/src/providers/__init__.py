@@ -1,4 +1,5 @@
 import logging
+from collections.abc import Mapping
 from dataclasses import dataclass
 
 from src.core.engine import Engine
@@ -16,6 +17,41 @@ def provider_factory(
     return loader.get_provider(config.get("provider"))(**config)
 
 
+class LazyProviders(Mapping):
+    """
+    A read-only mapping from provider identifiers to provider instances.
+
+    A provider is only instantiated the first time it is looked up, and the instance is shared
+    by every pipeline referencing the same identifier afterwards. Providers which are configured
+    but not used by any pipeline are never instantiated.
+    """
+
+    def __init__(self, configs: dict[str, dict]):
+        self._configs = configs
+        self._instances = {}
+
+    def __getitem__(self, identifier: str):
+        if identifier not in self._instances:
+            self._instances[identifier] = provider_factory(self._configs[identifier])
+        return self._instances[identifier]
+
+    # membership only depends on the configs, and errors raised while instantiating a provider
+    # are propagated instead of being taken as a missing key by `Mapping.get`
+    def __contains__(self, identifier: object) -> bool:
+        return identifier in self._configs
+
+    def get(self, identifier: str, default=None):
+        if identifier not in self._configs:
+            return default
+        return self[identifier]
+
+    def __iter__(self):
+        return iter(self._configs)
+
+    def __len__(self):
+        return len(self._configs)
+
+
 def llm_processor(entry: dict) -> dict:
     """
     Process the LLM configuration entry.
@@ -306,7 +342,8 @@ def generate_components(configs: list[dict]) -> dict[str, PipelineComponent]:
 
     This function takes a list of configuration dictionaries and generates pipeline components
     based on the provided configurations. The configurations are processed into a standardized
-    format and then instantiated into actual provider objects.
+    format and then instantiated into actual provider objects. Only the providers referenced
+    by the pipelines are instantiated, once per identifier.
 
     Args:
         configs (list[dict]): A list of configuration dictionaries.
@@ -332,11 +369,7 @@ def generate_components(configs: list[dict]) -> dict[str, PipelineComponent]:
     config = transform(configs)
 
     instantiated_providers = {
-        type: {
-            identifier: provider_factory(config)
-            for identifier, config in configs.items()
-        }
-        for type, configs in config.providers.items()
+        type: LazyProviders(configs) for type, configs in config.providers.items()
     }
 
     def get(type: str, components: dict, instantiated_providers: dict):
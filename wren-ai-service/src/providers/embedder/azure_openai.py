@@ -64,7 +64,7 @@ class AsyncTextEmbedder(AzureOpenAITextEmbedder):
                 "In case you want to embed a list of Documents, please use the AzureOpenAIDocumentEmbedder."
             )
 
-        logger.info(f"Running Async Azure OpenAI text embedder with text: {text}")
+        logger.debug("Running Async Azure OpenAI text embedder with text: %s", text)
 
         text_to_embed = self.prefix + text + self.suffix
 
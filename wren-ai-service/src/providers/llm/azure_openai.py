@@ -73,7 +73,7 @@ class AsyncGenerator(AzureOpenAIGenerator):
         generation_kwargs: Optional[Dict[str, Any]] = None,
         query_id: Optional[str] = None,
     ):
-        logger.info(f"running async azure generator with prompt : {prompt}")
+        logger.debug("running async azure generator with prompt : %s", prompt)
         message = ChatMessage.from_user(prompt)
         if self.system_prompt:
             messages = [ChatMessage.from_system(self.system_prompt), message]
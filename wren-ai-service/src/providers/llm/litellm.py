@@ -1,11 +1,13 @@
+import logging
 import os
 from typing import Any, Callable, Dict, List, Optional, Union
 
+import litellm
 from haystack.components.generators.openai_utils import (
     _convert_message_to_openai_format,
 )
 from haystack.dataclasses import ChatMessage, StreamingChunk
-from litellm import acompletion
+from litellm import Router, acompletion, get_llm_provider
 from litellm.types.utils import ModelResponse
 
 from src.core.provider import LLMProvider
@@ -18,6 +20,34 @@ from src.providers.llm import (
 from src.providers.loader import provider
 from src.utils import remove_trailing_slash
 
+logger = logging.getLogger("wren-ai-service")
+
+
+def _supports_cache_control(model: str) -> bool:
+    """
+    Anthropic models only cache the prompt prefix marked with `cache_control`,
+    while OpenAI models cache it automatically.
+    """
+    try:
+        _, llm_provider, _, _ = get_llm_provider(model=model)
+    except Exception:
+        return False
+
+    return llm_provider == "anthropic"
+
+
+def _enable_response_cache() -> None:
+    """
+    Cache the LLM completion responses in litellm if LITELLM_CACHE is set, e.g. "local" or "redis".
+    Redis is configured by litellm itself with REDIS_URL or REDIS_HOST, REDIS_PORT and REDIS_PASSWORD.
+    Embedding calls are not cached, since the cache is set globally in litellm and shared with the embedders.
+    """
+    if (cache_type := os.getenv("LITELLM_CACHE")) and litellm.cache is None:
+        logger.info(f"Enabling litellm response cache: {cache_type}")
+        litellm.enable_cache(
+            type=cache_type, supported_call_types=["acompletion", "completion"]
+        )
+
 
 @provider("litellm_llm")
 class LitellmLLMProvider(LLMProvider):
@@ -31,6 +61,8 @@ class LitellmLLMProvider(LLMProvider):
         api_version: Optional[str] = None,
         kwargs: Optional[Dict[str, Any]] = None,
         timeout: float = 120.0,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
         **_,
     ):
         self._model = model
@@ -39,6 +71,35 @@ class LitellmLLMProvider(LLMProvider):
         self._api_version = api_version
         self._model_kwargs = kwargs
         self._timeout = timeout
+        self._cache_control = _supports_cache_control(model)
+
+        # route the requests through a litellm router when rate limits are configured for the model,
+        # the router doesn't queue the requests: requests over the limits are rejected with rate limit errors,
+        # and retried up to `num_retries` times before failing
+        self._router = (
+            Router(
+                model_list=[
+                    {
+                        "model_name": model,
+                        "litellm_params": {
+                            "model": model,
+                            "api_key": self._api_key,
+                            "api_base": self._api_base,
+                            "api_version": self._api_version,
+                            "timeout": self._timeout,
+                            "rpm": rpm,
+                            "tpm": tpm,
+                        },
+                    }
+                ],
+                routing_strategy="usage-based-routing-v2",
+                num_retries=2,
+            )
+            if rpm or tpm
+            else None
+        )
+
+        _enable_response_cache()
 
     def get_generator(
         self,
@@ -69,22 +130,38 @@ class LitellmLLMProvider(LLMProvider):
             openai_formatted_messages = [
                 _convert_message_to_openai_format(message) for message in messages
             ]
+            if system_prompt and self._cache_control:
+                openai_formatted_messages[0]["content"] = [
+                    {
+                        "type": "text",
+                        "text": system_prompt,
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                ]
 
             generation_kwargs = {
                 **combined_generation_kwargs,
                 **(generation_kwargs or {}),
             }
 
-            completion: Union[ModelResponse] = await acompletion(
-                model=self._model,
-                api_key=self._api_key,
-                api_base=self._api_base,
-                api_version=self._api_version,
-                timeout=self._timeout,
-                messages=openai_formatted_messages,
-                stream=streaming_callback is not None,
-                **generation_kwargs,
-            )
+            if self._router:
+                completion: Union[ModelResponse] = await self._router.acompletion(
+                    model=self._model,
+                    messages=openai_formatted_messages,
+                    stream=streaming_callback is not None,
+                    **generation_kwargs,
+                )
+            else:
+                completion: Union[ModelResponse] = await acompletion(
+                    model=self._model,
+                    api_key=self._api_key,
+                    api_base=self._api_base,
+                    api_version=self._api_version,
+                    timeout=self._timeout,
+                    messages=openai_formatted_messages,
+                    stream=streaming_callback is not None,
+                    **generation_kwargs,
+                )
 
             completions: List[ChatMessage] = []
             if streaming_callback is not None:
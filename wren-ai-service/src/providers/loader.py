@@ -1,3 +1,4 @@
+import functools
 import importlib
 import logging
 import pkgutil
@@ -9,6 +10,7 @@ PROVIDERS_PATH = "src.providers"
 PROVIDERS = {}
 
 
+@functools.cache
 def import_mods(package_name=PROVIDERS_PATH):
     """
     This function is designed to import all submodules within a given package,
@@ -21,6 +23,8 @@ def import_mods(package_name=PROVIDERS_PATH):
     This is particularly useful in scenarios where you want to ensure that all submodules are loaded
     and ready for use, without having to manually import each one individually.
 
+    The result is memoized per package name, so calling it again is a no-op.
+
     Parameters:
         package_name (str): The name of the initial package to import submodules from.
         Defaults to the value of PROVIDERS_PATH.
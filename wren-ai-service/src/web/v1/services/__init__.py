@@ -31,12 +31,20 @@ class Configuration(BaseModel):
         name: str = "UTC"
         utc_offset: str = ""  # Deprecated, will be removed in the future
 
-    def show_current_time(self):
+    def show_current_time(self, granularity: int = 1):
         # Get the current time in the specified timezone
         tz = pytz.timezone(
             self.timezone.name
         )  # Assuming timezone.name contains the timezone string
         current_time = datetime.now(tz)
+        if granularity > 1:
+            # floor the local time to the granularity (unit: seconds), so the time stays the same within the window,
+            # and it is the start of the local window even if the timezone offset isn't a multiple of the granularity
+            offset = int(current_time.utcoffset().total_seconds())
+            local_timestamp = int(current_time.timestamp()) + offset
+            current_time = datetime.fromtimestamp(
+                local_timestamp - local_timestamp % granularity - offset, tz
+            )
 
         return f"{current_time.strftime('%Y-%m-%d %A %H:%M:%S')}"  # YYYY-MM-DD weekday_name HH:MM:SS, ex: 2024-10-23 Wednesday 12:00:00
 
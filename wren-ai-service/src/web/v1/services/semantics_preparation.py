@@ -70,7 +70,7 @@ class SemanticsPreparationService:
         }
 
         try:
-            logger.info(f"MDL: {prepare_semantics_request.mdl}")
+            logger.debug("MDL: %s", prepare_semantics_request.mdl)
 
             input = {
                 "mdl_str": prepare_semantics_request.mdl,
@@ -0,0 +1,18 @@
+import pytest
+
+from src.core.engine import clean_generation_result
+
+
+@pytest.mark.parametrize(
+    "result, expected",
+    [
+        ('```json\n{"sql": "SELECT 1;"}\n```', ' {"sql": "SELECT 1"} '),
+        ('```sql\nSELECT *\n  FROM "book";\n```', ' SELECT * FROM "book" '),
+        ('"""SELECT\\n1"""', "SELECT 1"),
+        ("'''SELECT 1'''", "SELECT 1"),
+        # the noise is removed in a single pass, so removing a match doesn't create a new one
+        ('SELECT 1 `"""``', "SELECT 1 ```"),
+    ],
+)
+def test_clean_generation_result(result: str, expected: str):
+    assert clean_generation_result(result) == expected
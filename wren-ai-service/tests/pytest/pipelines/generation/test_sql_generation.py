@@ -0,0 +1,390 @@
+import asyncio
+
+import pytest
+from haystack.components.builders.prompt_builder import PromptBuilder
+from pytest_mock import MockerFixture
+
+from src.core.engine import Engine
+from src.core.provider import EmbedderProvider, LLMProvider
+from src.pipelines.generation.sql_generation import (
+    SQLGeneration,
+    prompt,
+    sql_generation_user_prompt_template,
+)
+from src.pipelines.generation.utils.sql import (
+    SQLGenerationCache,
+    construct_sql_generation_system_prompt,
+    json_key,
+    stable_order,
+)
+from src.pipelines.retrieval.sql_functions import SqlFunction
+from src.web.v1.services import Configuration
+
+
+class MockEmbedder:
+    def __init__(self, embeddings: dict[str, list[float]]):
+        self._embeddings = embeddings
+
+    async def run(self, text: str):
+        return {"embedding": self._embeddings[text]}
+
+
+async def cached_run(
+    cache: SQLGenerationCache, prompt: str, query: str, context: dict, replies: dict
+) -> dict:
+    lookup = await cache.lookup(prompt, query, context)
+    if lookup.hit:
+        return lookup.replies
+
+    cache.store(lookup, replies)
+    return replies
+
+
+@pytest.mark.asyncio
+async def test_generation_cache_exact_match():
+    cache = SQLGenerationCache()
+    context = {"documents": ["doc"]}
+
+    first = await cached_run(cache, "prompt", "question", context, {"replies": ["1"]})
+    second = await cached_run(cache, "prompt", "question", context, {"replies": ["2"]})
+    assert first == second == {"replies": ["1"]}
+
+    another = await cached_run(
+        cache, "another prompt", "question", context, {"replies": ["3"]}
+    )
+    assert another == {"replies": ["3"]}
+
+
+@pytest.mark.asyncio
+async def test_generation_cache_semantic_match():
+    cache = SQLGenerationCache(
+        embedder=MockEmbedder(
+            {
+                "how many books": [1.0, 0.0],
+                "how many books are there": [0.99, 0.01],
+                "list all authors": [0.0, 1.0],
+            }
+        ),
+        similarity_threshold=0.95,
+    )
+    context = {"documents": ["doc"], "instructions": None}
+
+    first = await cached_run(
+        cache, "prompt 1", "how many books", context, {"replies": ["1"]}
+    )
+    similar = await cached_run(
+        cache, "prompt 2", "how many books are there", context, {"replies": ["2"]}
+    )
+    assert similar == first
+
+    # the same question with any other prompt section changed must not be reused
+    for other_context in [
+        {"documents": ["other"], "instructions": None},
+        {"documents": ["doc"], "instructions": [{"instruction": "new instruction"}]},
+    ]:
+        assert await cached_run(
+            cache,
+            "prompt 3",
+            "how many books are there",
+            other_context,
+            {"replies": ["3"]},
+        ) == {"replies": ["3"]}
+
+    different = await cached_run(
+        cache, "prompt 4", "list all authors", context, {"replies": ["4"]}
+    )
+    assert different == {"replies": ["4"]}
+
+
+@pytest.mark.asyncio
+async def test_generation_cache_semantic_entries_expire_on_their_own():
+    now = 0.0
+    cache = SQLGenerationCache(
+        embedder=MockEmbedder(
+            {
+                "how many books": [1.0, 0.0],
+                "how many books are there": [0.99, 0.01],
+                "list all authors": [0.0, 1.0],
+                "list the authors": [0.01, 0.99],
+            }
+        ),
+        ttl=3600,
+        timer=lambda: now,
+    )
+    context = {"documents": ["doc"]}
+
+    await cached_run(cache, "prompt 1", "how many books", context, {"replies": ["1"]})
+    now = 3000.0
+    # storing another question under the same context must not extend the first entry
+    await cached_run(cache, "prompt 2", "list all authors", context, {"replies": ["2"]})
+
+    now = 3601.0
+    assert await cached_run(
+        cache, "prompt 3", "how many books are there", context, {"replies": ["3"]}
+    ) == {"replies": ["3"]}
+    assert await cached_run(
+        cache, "prompt 4", "list the authors", context, {"replies": ["4"]}
+    ) == {"replies": ["2"]}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fast_path", [False, True])
+async def test_generation_cache_only_stores_valid_sql(
+    mocker: MockerFixture, fast_path: bool
+):
+    calls = 0
+
+    async def generator(prompt: str, **_):
+        nonlocal calls
+        calls += 1
+        return {"replies": ['{"sql": "SELECT COUNT(*) FROM book"}']}
+
+    llm_provider = mocker.Mock(spec=LLMProvider)
+    llm_provider.get_generator.return_value = generator
+    engine = mocker.Mock(spec=Engine)
+    engine.execute_sql = mocker.AsyncMock(
+        side_effect=[
+            (False, None, {"error_message": "table not found", "correlation_id": "id"}),
+            (True, None, {"correlation_id": "id"}),
+            (True, None, {"correlation_id": "id"}),
+        ]
+    )
+
+    pipeline = SQLGeneration(
+        llm_provider=llm_provider,
+        engine=engine,
+        semantic_cache_enabled=True,
+        fast_path=fast_path,
+    )
+
+    async def run():
+        return await pipeline.run(
+            query="How many books are there?",
+            contexts=["CREATE TABLE book (id INTEGER)"],
+            configuration=Configuration(),
+        )
+
+    invalid = await run()
+    assert invalid["post_process"]["invalid_generation_results"]
+    valid = await run()
+    assert valid["post_process"]["valid_generation_results"]
+    cached = await run()
+    assert cached == valid
+
+    # the invalid reply is regenerated, the valid one is served from the cache
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_generation_cache_keys_on_time_and_system_prompt(mocker: MockerFixture):
+    calls = 0
+
+    async def generator(prompt: str, **_):
+        nonlocal calls
+        calls += 1
+        return {"replies": ['{"sql": "SELECT COUNT(*) FROM book"}']}
+
+    llm_provider = mocker.Mock(spec=LLMProvider)
+    llm_provider.get_generator.return_value = generator
+    embedder_provider = mocker.Mock(spec=EmbedderProvider)
+    embedder_provider.get_text_embedder.return_value = MockEmbedder(
+        {"How many books are there?": [1.0, 0.0]}
+    )
+    engine = mocker.Mock(spec=Engine)
+    engine.execute_sql = mocker.AsyncMock(
+        return_value=(True, None, {"correlation_id": "id"})
+    )
+    show_current_time = mocker.patch.object(
+        Configuration, "show_current_time", return_value="2024-10-23 Wednesday 12:00:00"
+    )
+
+    pipeline = SQLGeneration(
+        llm_provider=llm_provider,
+        engine=engine,
+        embedder_provider=embedder_provider,
+        semantic_cache_enabled=True,
+    )
+
+    async def run(timezone: str = "UTC", has_metric: bool = False):
+        await pipeline.run(
+            query="How many books are there?",
+            contexts=["CREATE TABLE book (id INTEGER)"],
+            configuration=Configuration(timezone=Configuration.Timezone(name=timezone)),
+            has_metric=has_metric,
+        )
+
+    await run()
+    await run()
+    assert calls == 1
+
+    # another timezone, another current time or another system prompt must not be reused
+    await run(timezone="Asia/Taipei")
+    assert calls == 2
+    show_current_time.return_value = "2024-10-24 Thursday 12:00:00"
+    await run()
+    assert calls == 3
+    await run(has_metric=True)
+    assert calls == 4
+
+
+@pytest.mark.asyncio
+async def test_run_batch(mocker: MockerFixture):
+    running, peak = 0, 0
+
+    async def generator(prompt: str, **_):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if "question 4" in prompt:
+            raise RuntimeError("LLM error")
+        index = prompt.split("User's Question: question ")[1].split()[0]
+        return {"replies": [f'{{"sql": "SELECT {index}"}}']}
+
+    llm_provider = mocker.Mock(spec=LLMProvider)
+    llm_provider.get_generator.return_value = generator
+    engine = mocker.Mock(spec=Engine)
+    engine.execute_sql = mocker.AsyncMock(
+        return_value=(True, None, {"correlation_id": "id"})
+    )
+    pipeline = SQLGeneration(llm_provider=llm_provider, engine=engine)
+
+    results = await pipeline.run_batch(
+        [{"query": f"question {i}", "contexts": []} for i in range(10)],
+        max_concurrency=3,
+    )
+
+    assert peak == 3
+    assert isinstance(results[4], RuntimeError)
+    assert [
+        result["post_process"]["valid_generation_results"][0]["sql"]
+        for i, result in enumerate(results)
+        if i != 4
+    ] == [f"SELECT {i}" for i in range(10) if i != 4]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fast_path", [False, True])
+async def test_run_with_or_without_fast_path(mocker: MockerFixture, fast_path: bool):
+    async def generator(prompt: str, **_):
+        assert "User's Question: How many books are there?" in prompt
+        return {"replies": ['{"sql": "SELECT COUNT(*) FROM book"}']}
+
+    llm_provider = mocker.Mock(spec=LLMProvider)
+    llm_provider.get_generator.return_value = generator
+    engine = mocker.Mock(spec=Engine)
+    engine.execute_sql = mocker.AsyncMock(
+        return_value=(True, None, {"correlation_id": "id"})
+    )
+
+    pipeline = SQLGeneration(
+        llm_provider=llm_provider, engine=engine, fast_path=fast_path
+    )
+    result = await pipeline.run(
+        query="How many books are there?",
+        contexts=["CREATE TABLE book (id INTEGER)"],
+    )
+
+    assert result == {
+        "post_process": {
+            "valid_generation_results": [
+                {"sql": 'SELECT COUNT(*) FROM "book"', "correlation_id": "id"}
+            ],
+            "invalid_generation_results": [],
+        }
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("has_calculated_field", [False, True])
+@pytest.mark.parametrize("has_metric", [False, True])
+async def test_schema_structure_instructions_in_system_prompt(
+    mocker: MockerFixture, has_calculated_field: bool, has_metric: bool
+):
+    used_system_prompts = []
+
+    def get_generator(system_prompt: str, **_):
+        async def generator(prompt: str, **_):
+            assert "Instructions for Calculated Field" not in prompt
+            assert "Instructions for Metric" not in prompt
+            used_system_prompts.append(system_prompt)
+            return {"replies": ['{"sql": "SELECT COUNT(*) FROM book"}']}
+
+        return generator
+
+    llm_provider = mocker.Mock(spec=LLMProvider)
+    llm_provider.get_generator.side_effect = get_generator
+    engine = mocker.Mock(spec=Engine)
+    engine.execute_sql = mocker.AsyncMock(
+        return_value=(True, None, {"correlation_id": "id"})
+    )
+
+    pipeline = SQLGeneration(llm_provider=llm_provider, engine=engine)
+    await pipeline.run(
+        query="How many books are there?",
+        contexts=["CREATE TABLE book (id INTEGER)"],
+        has_calculated_field=has_calculated_field,
+        has_metric=has_metric,
+    )
+
+    assert llm_provider.get_generator.call_count == 4
+    assert used_system_prompts == [
+        construct_sql_generation_system_prompt(has_calculated_field, has_metric)
+    ]
+    assert (
+        "Instructions for Calculated Field" in used_system_prompts[0]
+    ) is has_calculated_field
+    assert ("Instructions for Metric" in used_system_prompts[0]) is has_metric
+
+
+def test_prompt_joins_documents_samples_and_functions():
+    result = prompt(
+        query="How many books are there?",
+        documents=[
+            "CREATE TABLE book (id INTEGER)",
+            "CREATE TABLE author (id INTEGER)",
+        ],
+        prompt_builder=PromptBuilder(template=sql_generation_user_prompt_template),
+        current_time="2024-10-23 Wednesday 12:00:00",
+        configuration=Configuration(),
+        sql_samples=[
+            {"question": "How many authors?", "sql": "SELECT COUNT(*) FROM author"}
+        ],
+        sql_functions=[
+            SqlFunction(
+                {
+                    "name": "abs",
+                    "function_type": "scalar",
+                    "description": "absolute value",
+                }
+            )
+        ],
+    )["prompt"]
+
+    assert (
+        "### DATABASE SCHEMA ###\n"
+        "CREATE TABLE book (id INTEGER)\n\nCREATE TABLE author (id INTEGER)\n"
+    ) in result
+    assert (
+        "### SQL SAMPLES ###\n"
+        "Question:\nHow many authors?\nSQL:\nSELECT COUNT(*) FROM author\n"
+    ) in result
+    assert (
+        "### SQL FUNCTIONS ###\ntype: scalar, name: ABS, description: absolute value\n"
+    ) in result
+
+
+def test_stable_order():
+    assert stable_order(None) is None
+    assert stable_order(["b", "a", "b"]) == stable_order(["a", "b"]) == ["a", "b"]
+
+    samples = [
+        {"question": "q2", "sql": "SELECT 2"},
+        {"sql": "SELECT 1", "question": "q1"},
+        {"question": "q2", "sql": "SELECT 2"},
+    ]
+    assert stable_order(samples, key=json_key) == [
+        {"question": "q1", "sql": "SELECT 1"},
+        {"question": "q2", "sql": "SELECT 2"},
+    ]
@@ -0,0 +1,116 @@
+import litellm
+import pytest
+from litellm import ModelResponse
+from pytest_mock import MockerFixture
+
+from src.providers.llm.litellm import LitellmLLMProvider
+
+
+def model_response(model: str) -> ModelResponse:
+    return ModelResponse(
+        model=model,
+        choices=[
+            {
+                "message": {"role": "assistant", "content": "SELECT 1"},
+                "finish_reason": "stop",
+                "index": 0,
+            }
+        ],
+        usage={"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    )
+
+
+@pytest.fixture(autouse=True)
+def no_response_cache(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv("LITELLM_CACHE", raising=False)
+    monkeypatch.setattr(litellm, "cache", None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "limits", [{"rpm": 10}, {"tpm": 10_000}, {"rpm": 10, "tpm": 10_000}]
+)
+async def test_generator_with_rate_limits_runs_through_router(
+    mocker: MockerFixture, limits: dict
+):
+    completion = mocker.patch("src.providers.llm.litellm.acompletion")
+    provider = LitellmLLMProvider(model="gpt-4o-mini", kwargs={}, **limits)
+    router_completion = mocker.patch.object(
+        provider._router,
+        "acompletion",
+        mocker.AsyncMock(return_value=model_response("gpt-4o-mini")),
+    )
+
+    result = await provider.get_generator()(prompt="question")
+
+    assert result["replies"] == ["SELECT 1"]
+    router_completion.assert_awaited_once()
+    assert router_completion.call_args.kwargs["model"] == "gpt-4o-mini"
+    completion.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_generator_without_rate_limits_calls_completion(mocker: MockerFixture):
+    completion = mocker.patch(
+        "src.providers.llm.litellm.acompletion",
+        mocker.AsyncMock(return_value=model_response("gpt-4o-mini")),
+    )
+    provider = LitellmLLMProvider(model="gpt-4o-mini", kwargs={})
+
+    result = await provider.get_generator()(prompt="question")
+
+    assert provider._router is None
+    assert result["replies"] == ["SELECT 1"]
+    completion.assert_awaited_once()
+
+
+def test_response_cache_is_enabled_once_if_configured(
+    mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch
+):
+    enable_cache = mocker.patch.object(
+        litellm,
+        "enable_cache",
+        side_effect=lambda **_: setattr(litellm, "cache", object()),
+    )
+
+    LitellmLLMProvider(model="gpt-4o-mini", kwargs={})
+    enable_cache.assert_not_called()
+
+    monkeypatch.setenv("LITELLM_CACHE", "local")
+    LitellmLLMProvider(model="gpt-4o-mini", kwargs={})
+    LitellmLLMProvider(model="gpt-4o-mini", kwargs={})
+
+    enable_cache.assert_called_once_with(
+        type="local", supported_call_types=["acompletion", "completion"]
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "model, cache_control",
+    [("anthropic/claude-3-5-sonnet-20241022", True), ("gpt-4o-mini", False)],
+)
+async def test_system_prompt_cache_control(
+    mocker: MockerFixture, model: str, cache_control: bool
+):
+    completion = mocker.patch(
+        "src.providers.llm.litellm.acompletion",
+        mocker.AsyncMock(return_value=model_response(model)),
+    )
+    provider = LitellmLLMProvider(model=model, kwargs={})
+
+    await provider.get_generator(system_prompt="system prompt")(prompt="question")
+
+    system_message, user_message = completion.call_args.kwargs["messages"]
+    assert system_message["role"] == "system"
+    if cache_control:
+        assert system_message["content"] == [
+            {
+                "type": "text",
+                "text": "system prompt",
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+    else:
+        assert system_message["content"] == "system prompt"
+    assert user_message == {"role": "user", "content": "question"}
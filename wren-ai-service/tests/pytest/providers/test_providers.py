@@ -1,9 +1,15 @@
+import pytest
 from pytest_mock import MockerFixture
 
 from src.core.engine import Engine
 from src.core.pipeline import PipelineComponent
 from src.core.provider import DocumentStoreProvider, EmbedderProvider, LLMProvider
-from src.providers import Configuration, generate_components, transform
+from src.providers import (
+    Configuration,
+    LazyProviders,
+    generate_components,
+    transform,
+)
 
 
 def test_transform():
@@ -101,3 +107,68 @@ def test_generate_components(mocker: MockerFixture):
     assert isinstance(result["indexing"].llm_provider, LLMProvider)
     assert isinstance(result["indexing"].document_store_provider, DocumentStoreProvider)
     assert isinstance(result["indexing"].engine, Engine)
+
+
+def test_generate_components_instantiates_referenced_providers_only(
+    mocker: MockerFixture,
+):
+    provider_factory = mocker.patch(
+        "src.providers.provider_factory",
+        side_effect=lambda config: mocker.Mock(spec=LLMProvider),
+    )
+
+    config = [
+        {
+            "type": "llm",
+            "provider": "openai_llm",
+            "models": [
+                {"model": "gpt-4", "kwargs": {}},
+                {"model": "gpt-4o-mini", "kwargs": {}},
+            ],
+        },
+        {
+            "type": "pipeline",
+            "pipes": [
+                {"name": "sql_generation", "llm": "openai_llm.gpt-4"},
+                {"name": "sql_answer", "llm": "openai_llm.gpt-4"},
+            ],
+        },
+    ]
+
+    result = generate_components(config)
+
+    assert provider_factory.call_count == 1
+    assert result["sql_generation"].llm_provider is result["sql_answer"].llm_provider
+    assert result["sql_generation"].embedder_provider is None
+
+
+def test_generate_components_raises_for_unknown_provider():
+    config = [
+        {
+            "type": "llm",
+            "provider": "litellm_lm_typo",
+            "models": [{"model": "gpt-4o-mini", "kwargs": {}}],
+        },
+        {
+            "type": "pipeline",
+            "pipes": [{"name": "sql_generation", "llm": "litellm_lm_typo.gpt-4o-mini"}],
+        },
+    ]
+
+    with pytest.raises(KeyError, match="litellm_lm_typo"):
+        generate_components(config)
+
+
+def test_lazy_providers_membership_does_not_instantiate(mocker: MockerFixture):
+    provider_factory = mocker.patch(
+        "src.providers.provider_factory", side_effect=KeyError("in provider init")
+    )
+    providers = LazyProviders({"openai_llm.gpt-4": {"provider": "openai_llm"}})
+
+    assert "openai_llm.gpt-4" in providers
+    assert "openai_llm.gpt-4o" not in providers
+    assert providers.get("openai_llm.gpt-4o") is None
+    provider_factory.assert_not_called()
+
+    with pytest.raises(KeyError, match="in provider init"):
+        providers.get("openai_llm.gpt-4")
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pytest
+import pytz
+
+from src.web.v1.services import Configuration
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        # 2024-10-23 Wednesday 12:34:56 UTC
+        return datetime(2024, 10, 23, 12, 34, 56, tzinfo=pytz.utc).astimezone(tz)
+
+
+@pytest.fixture(autouse=True)
+def frozen_datetime(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("src.web.v1.services.datetime", FrozenDatetime)
+
+
+@pytest.mark.parametrize(
+    "timezone, granularity, expected",
+    [
+        ("UTC", 1, "2024-10-23 Wednesday 12:34:56"),
+        ("UTC", 60, "2024-10-23 Wednesday 12:34:00"),
+        ("UTC", 3600, "2024-10-23 Wednesday 12:00:00"),
+        ("America/New_York", 1, "2024-10-23 Wednesday 08:34:56"),
+        ("America/New_York", 60, "2024-10-23 Wednesday 08:34:00"),
+        # the local time is floored, so a half-hour offset still renders the start of the local hour
+        ("Asia/Kolkata", 60, "2024-10-23 Wednesday 18:04:00"),
+        ("Asia/Kolkata", 3600, "2024-10-23 Wednesday 18:00:00"),
+        ("Asia/Kolkata", 86400, "2024-10-23 Wednesday 00:00:00"),
+        ("America/New_York", 86400, "2024-10-23 Wednesday 00:00:00"),
+    ],
+)
+def test_show_current_time(timezone: str, granularity: int, expected: str):
+    configuration = Configuration(timezone=Configuration.Timezone(name=timezone))
+
+    assert configuration.show_current_time(granularity) == expected
+
+
+def test_show_current_time_defaults_to_seconds():
+    assert Configuration().show_current_time() == "2024-10-23 Wednesday 12:34:56"